@@ -1,7 +1,11 @@
-import itertools
+import concurrent.futures
+import email.utils
+import gzip
 import logging
 import os
 import pathlib
+import re
+import shutil
 import socket
 import sys
 import time
@@ -10,7 +14,6 @@ import typing
 import urllib.request
 
 from datetime import datetime
-from tqdm import tqdm
 from urllib.error import HTTPError
 
 logger = logging.getLogger(__name__)
@@ -18,10 +21,28 @@ logger = logging.getLogger(__name__)
 WORD_LIST_URL = "https://raw.githubusercontent.com/dwyl/english-words/refs/heads/master/words.txt"
 WORD_LIST_FILE = "words.txt"
 ETAG_FILE = "etag.txt"
+WORD_CACHE_FILE = "words.{word_length}.txt"
+DEFAULT_UPDATE_CHECK_TTL = 24 * 60 * 60
+DOWNLOAD_TIMEOUT = 10
 ENGLISH_CHARACTERS = "abcdefghijklmnopqrstuvwxyz"
 
 
+def get_update_check_ttl():
+    ttl = os.environ.get("WORDLE_CHECK_TTL")
+    if ttl is None:
+        return DEFAULT_UPDATE_CHECK_TTL
+    try:
+        return float(ttl)
+    except ValueError:
+        logger.debug(f"Invalid WORDLE_CHECK_TTL {ttl!r}. Using default of {DEFAULT_UPDATE_CHECK_TTL}s.")
+        return DEFAULT_UPDATE_CHECK_TTL
+
+
 def download_if_updated():
+    if os.path.exists(WORD_LIST_FILE) and os.path.exists(ETAG_FILE) and time.time() - os.path.getmtime(ETAG_FILE) < get_update_check_ttl():
+        logger.debug("Words list was checked recently. Skipping update check.")
+        return
+
     logger.debug("Checking for updates to words list...")
     req = urllib.request.Request(WORD_LIST_URL, method="GET")
 
@@ -30,15 +51,32 @@ def download_if_updated():
             etag = f.read().strip()
             if etag:
                 req.add_header("If-None-Match", etag)
+    if os.path.exists(WORD_LIST_FILE):
+        req.add_header("If-Modified-Since", email.utils.formatdate(os.path.getmtime(WORD_LIST_FILE), usegmt=True))
+    req.add_header("Accept-Encoding", "gzip")
 
     try:
-        with urllib.request.urlopen(req) as response:
+        with urllib.request.urlopen(req, timeout=DOWNLOAD_TIMEOUT) as response:
             if response.status == 200:
                 logger.debug('Updating words list...')
                 new_etag = response.getheader("ETag", "")
-                content = response.read()
-                with open(WORD_LIST_FILE, "wb") as f:
-                    f.write(content)
+                # urllib does not decode compressed bodies, so gzip is unwrapped here and anything else is rejected
+                content_encoding = response.getheader("Content-Encoding", "").strip().lower()
+                if content_encoding in ("gzip", "x-gzip"):
+                    source = gzip.GzipFile(fileobj=response)
+                elif content_encoding in ("", "identity"):
+                    source = response
+                else:
+                    logger.debug(f"Unsupported word list encoding: {content_encoding}")
+                    return
+                temp_file = f"{WORD_LIST_FILE}.part"
+                try:
+                    with open(temp_file, "wb") as f:
+                        shutil.copyfileobj(source, f, 1 << 16)
+                    os.replace(temp_file, WORD_LIST_FILE)
+                finally:
+                    if os.path.exists(temp_file):
+                        os.remove(temp_file)
                 if new_etag:
                     with open(ETAG_FILE, "w") as f:
                         f.write(new_etag)
@@ -46,6 +84,8 @@ def download_if_updated():
     except HTTPError as e:
         if e.code == 304:
             logger.debug("Word list has not modified. Using cached version.")
+            if os.path.exists(ETAG_FILE):
+                os.utime(ETAG_FILE)
         else:
             logger.debug(f"Error downloading word list: {e}")
     except Exception as e:
@@ -54,76 +94,128 @@ def download_if_updated():
 
 def load_words(file_path, word_length):
     logger.debug(f"Loading words list...")
-    words = []
-    with open(file_path, "r") as f:
-        for word in f:
-            word = word.strip().lower()
-            if len(word) == word_length and word.isalpha():
-                words.append(word)
+    data = pathlib.Path(file_path).read_bytes().lower()
+    words = sorted(set(word for word in (line.strip() for line in data.splitlines()) if len(word) == word_length and word.isalpha()))
     logger.debug(f"{len(words)} {word_length}-letter words loaded.")
-    return words
+    # One word per line so a single multiline regex scan covers the whole list
+    return b"\n".join(words).decode()
+
+
+def load_word_list(word_length):
+    cache_file = WORD_CACHE_FILE.format(word_length=word_length)
+    if os.path.exists(cache_file) and os.path.getmtime(WORD_LIST_FILE) <= os.path.getmtime(cache_file):
+        logger.debug("Loading cached word list...")
+        try:
+            return pathlib.Path(cache_file).read_text(encoding="utf-8")
+        except Exception as e:
+            logger.debug(f"Error loading cached word list: {e}")
+
+    word_list = load_words(WORD_LIST_FILE, word_length)
+    # Write to a per-process temp file and swap it in so a crash or a second instance never leaves a truncated cache
+    temp_file = f"{cache_file}.{os.getpid()}.part"
+    try:
+        pathlib.Path(temp_file).write_text(word_list, encoding="utf-8")
+        os.replace(temp_file, cache_file)
+    except Exception as e:
+        logger.debug(f"Error saving cached word list: {e}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+    return word_list
 
 
-def generate_words(greens, yellows, grays, english_words, word_length):
+def build_word_pattern(chars_by_index, yellow_chars):
+    required = "".join(f"(?=[^\\n]*{re.escape(char)})" for char in sorted(yellow_chars))
+    positions = "".join(f"[{''.join(re.escape(char) for char in sorted(chars))}]" for chars in chars_by_index)
+    return re.compile(f"^{required}{positions}$", re.MULTILINE)
+
+
+def generate_words(greens, yellows, grays, word_list, word_length):
     green_chars = list(set(greens.values()))
     yellow_chars = list(set(char for chars in yellows.values() for char in chars))
     gray_chars = list(set(grays))
-    available_chars = list(set(green_chars + yellow_chars + gray_chars))
+    available_chars = frozenset(green_chars + yellow_chars + gray_chars)
+
+    for index in list(greens) + list(yellows):
+        if not 0 <= index < word_length:
+            raise ValueError(f"Position {index + 1} is outside a {word_length}-letter word.")
 
-    chars_by_index = {str(i): available_chars[:] for i in range(1, word_length + 1)}
+    chars_by_index = [set(available_chars) for _ in range(word_length)]
 
     for index, char in greens.items():
-        chars_by_index[str(index)] = [char]
+        chars_by_index[index] = {char}
 
     for index, chars in yellows.items():
         for char in chars:
-            while char in chars_by_index[str(index)]:
-                chars_by_index[str(index)].remove(char)
-
-    lengths = [len(chars_by_index[str(i)]) for i in range(1, word_length + 1)]
-    n_letter_combinations = 1
-    for length in lengths:
-        n_letter_combinations *= length
-
-    logger.debug(f"Generating {n_letter_combinations} possible letter combinations...")
-    generated_words = []
-    for combo in tqdm(itertools.product(*(chars_by_index[str(i)] for i in range(1, word_length + 1))),
-                      total=n_letter_combinations, desc="Generating words", unit="word"):
-        generated_word = "".join(combo)
-        if not all(char in generated_word for char in yellow_chars):
-            continue
-        if generated_word not in english_words:
-            continue
-        if generated_word not in generated_words:
-            generated_words.append(generated_word)
+            chars_by_index[index].discard(char)
+
+    if not all(chars_by_index):
+        logger.debug("A position has no allowed letters.")
+        return []
+
+    pattern = build_word_pattern(chars_by_index, yellow_chars)
+    logger.debug(f"Searching word list with {pattern.pattern!r}...")
+    generated_words = pattern.findall(word_list)
 
     logger.debug(f"Generated {len(generated_words)} possible words.")
     return generated_words
 
 
+def prepare_word_list(word_length):
+    download_if_updated()
+    if not os.path.exists(WORD_LIST_FILE):
+        return None
+    return load_word_list(word_length)
+
+
 def main() -> None:
     word_length = int(input("\nEnter word length (e.g., 5 for Wordle):\n>>> ").strip())
     if word_length < 1:
         raise ValueError("Word length must be at least 1.")
-    green = input("\n🟩 Which letters are correct? Use '_' for unknowns. E.g. '__a__'\n>>> ").strip().lower()
-    yellow = input("\n🟨 Which letters are used but in the wrong positions? Format being 'a1 b3' meaning 'a not in pos 1, b not in pos 3'\n>>> ").strip().lower()
-    gray = input("⬜ Which letters are still availble? Just list them. E.g. 'xqz'\n>>> ").strip().lower()
+
+    # Download and load the word list while the user is still typing.
+    # Its log records are held back until then so they do not break up the prompts.
+    deferred_records = []
+
+    def defer_word_list_records(record):
+        if record.threadName.startswith("word_list"):
+            deferred_records.append(record)
+            return False
+        return True
+
+    logger.addFilter(defer_word_list_records)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="word_list")
+    word_list_future = executor.submit(prepare_word_list, word_length)
+    try:
+        green = input("\n🟩 Which letters are correct? Use '_' for unknowns. E.g. '__a__'\n>>> ").strip().lower()
+        yellow = input("\n🟨 Which letters are used but in the wrong positions? Format being 'a1 b3' meaning 'a not in pos 1, b not in pos 3'\n>>> ").strip().lower()
+        gray = input("⬜ Which letters are still availble? Just list them. E.g. 'xqz'\n>>> ").strip().lower()
+    except BaseException:
+        # Keep holding the worker's records until it stops so they cannot print over later prompts
+        word_list_future.add_done_callback(lambda _: logger.removeFilter(defer_word_list_records))
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
 
     start_time = time.perf_counter()
+    try:
+        word_list = word_list_future.result()
+    finally:
+        executor.shutdown()
+        logger.removeFilter(defer_word_list_records)
+        for record in deferred_records:
+            logger.handle(record)
     logger.info("Starting operation...")
 
-    download_if_updated()
-    if not os.path.exists(WORD_LIST_FILE):
+    if word_list is None:
         logger.debug("❌ 'words.txt' not found. Aborting.")
         return
 
-    english_words = load_words(WORD_LIST_FILE, word_length)
-
     # Process greens
+    if len(green) > word_length:
+        raise ValueError(f"Green letters '{green}' are longer than the word length of {word_length}.")
     greens = {}
-    for i, char in enumerate(green, start=1):
+    for i, char in enumerate(green):
         if char != '_':
-            greens[str(i)] = char
+            greens[i] = char
     logger.debug(f'Green: {green}')
     logger.debug(f"Greens: {greens}")
 
@@ -131,8 +223,12 @@ def main() -> None:
     yellows = {}
     for part in yellow.split():
         letter = part[0]
-        number = part[1:]
-        yellows.setdefault(number, []).append(letter)
+        if not part[1:].isdigit() or not 1 <= int(part[1:]) <= word_length:
+            raise ValueError(f"Yellow '{part}' must name a position from 1 to {word_length}.")
+        index = int(part[1:]) - 1
+        position_yellows = yellows.setdefault(index, [])
+        if letter not in position_yellows:
+            position_yellows.append(letter)
     logger.debug(f'Yellow: {yellow}')
     logger.debug(f"Yellows: {yellows}")
 
@@ -141,12 +237,10 @@ def main() -> None:
     logger.debug(f'Gray: {gray}')
     logger.debug(f"Grays: {grays}")
 
-    generated_words = generate_words(greens, yellows, grays, english_words, word_length)
+    generated_words = generate_words(greens, yellows, grays, word_list, word_length)
 
     if len(generated_words) > 0:
-        logger.info(f"Generated the following possible words:")
-        for word in generated_words:
-            logger.info(f"- {word}")
+        logger.info("Generated the following possible words:\n%s", "\n".join(f"- {word}" for word in generated_words))
     else:
         logger.info("No possible words found with the given constraints.")
 